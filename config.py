@@ -15,4 +15,6 @@ MANUAL_EXPIRY_DATE = "2025-09-25"  # Format: YYYY-MM-DD
 MANUAL_SPOT_PRICE = 48000.0       # Spot price at the time of entry
 
 # -- Output --
-EXCEL_FILE_NAME = "live_trade_log.xlsx"
+TRADE_LOG_FILE = "live_trade_log.csv"        # Appended to by main.py
+EXCEL_FILE_NAME = "live_trade_log.xlsx"      # Old Excel log, copied into TRADE_LOG_FILE once
+REPORT_FILE_NAME = "live_trade_report.xlsx"  # Written on demand by make_report.py
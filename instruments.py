@@ -0,0 +1,161 @@
+import pandas as pd
+from datetime import date
+import os
+import shutil
+import gc
+import glob
+import requests
+from email.utils import formatdate
+
+INSTRUMENT_MASTER_URL = "https://images.dhan.co/api-data/api-scrip-master.csv"
+
+# Columns of the instrument master that the trading scripts actually read.
+INSTRUMENT_COLUMNS = [
+    'SEM_TRADING_SYMBOL', 'SEM_EXM_EXCH_ID', 'SEM_SMST_SECURITY_ID', 'SEM_EXCH_INSTRUMENT_TYPE',
+    'SM_SYMBOL_NAME', 'SEM_EXPIRY_DATE', 'SEM_SERIES'
+]
+INSTRUMENT_DTYPES = {
+    'SEM_TRADING_SYMBOL': 'string', 'SEM_EXM_EXCH_ID': 'category', 'SEM_SMST_SECURITY_ID': 'int64',
+    'SEM_EXCH_INSTRUMENT_TYPE': 'category', 'SM_SYMBOL_NAME': 'category', 'SEM_SERIES': 'category'
+}
+
+# (exchange, trading symbol) -> security ID, filled by build_security_id_index().
+SYMBOL_TO_SECID = {}
+
+# The instrument master loaded by get_instrument_df(), shared by every importer.
+_cached_df = None
+
+# --- Instrument Functions ---
+
+def get_instrument_df():
+    """
+    Returns the instrument master, loading it and building the security ID
+    index on first use. Later calls in the same process reuse the same DataFrame.
+    """
+    global _cached_df
+    if _cached_df is None:
+        _cached_df = get_instrument_file()
+        if _cached_df is not None:
+            build_security_id_index(_cached_df)
+    return _cached_df
+
+def get_instrument_file():
+    """
+    Downloads or reads the master list of all tradable instruments from Dhan.
+    Saves it locally for the day to avoid re-downloading. A Parquet copy of the
+    CSV is kept alongside it so repeat runs skip the CSV parse entirely.
+    """
+    current_date_str = date.today().strftime("%Y-%m-%d")
+    dir_name = "Dependencies"
+    expected_file = os.path.join(dir_name, f"all_instrument {current_date_str}.csv")
+    parquet_file = expected_file.replace('.csv', '.parquet')
+
+    if not os.path.exists(dir_name):
+        os.makedirs(dir_name)
+
+    if os.path.exists(parquet_file):
+        print(f"Reading cached instrument file for today.")
+        try:
+            return pd.read_parquet(parquet_file, columns=INSTRUMENT_COLUMNS)
+        except Exception as e:
+            print(f"Warning: Discarding unreadable instrument cache {parquet_file}: {e}")
+            os.remove(parquet_file)
+
+    if os.path.exists(expected_file):
+        print(f"Reading existing instrument file for today.")
+        instrument_df = read_instrument_csv(expected_file)
+        write_instrument_cache(instrument_df, parquet_file)
+        return instrument_df
+    else:
+        stale_files = glob.glob(os.path.join(dir_name, 'all_instrument*'))
+        previous_file = max((f for f in stale_files if f.endswith('.csv')), key=os.path.getmtime, default=None)
+
+        print("Downloading new instrument file from Dhan...")
+        try:
+            content = download_instrument_master(previous_file)
+            # Keep today's CSV as the full, unmodified master; Dhan_websocket.py reuses it.
+            temp_file = expected_file + '.tmp'
+            if content is None:
+                print("Instrument file unchanged on Dhan, reusing the previous download.")
+                shutil.copyfile(previous_file, temp_file)
+            else:
+                with open(temp_file, 'wb') as f:
+                    f.write(content)
+            os.replace(temp_file, expected_file)
+
+            instrument_df = read_instrument_csv(expected_file)
+            write_instrument_cache(instrument_df, parquet_file)
+            # Only drop older copies once today's file is safely on disk.
+            for stale_file in stale_files:
+                os.remove(stale_file)
+            print("New instrument file downloaded successfully.")
+            return instrument_df
+        except Exception as e:
+            print(f"FATAL: Error downloading instrument file: {e}")
+            return None
+
+def download_instrument_master(previous_file=None):
+    """
+    Downloads the raw instrument master CSV from Dhan with gzip transfer encoding.
+    If a previous download exists, returns None when Dhan reports it is unchanged.
+    The If-Modified-Since date is the local file's write time, not the server's
+    Last-Modified, so it only approximates when Dhan last published the file.
+    """
+    headers = {'Accept-Encoding': 'gzip'}
+    if previous_file:
+        headers['If-Modified-Since'] = formatdate(os.path.getmtime(previous_file), usegmt=True)
+
+    response = requests.get(INSTRUMENT_MASTER_URL, headers=headers, timeout=60)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    return response.content
+
+def read_instrument_csv(source):
+    """
+    Parses only the needed columns of the instrument master with fixed dtypes,
+    so pandas does not have to infer types across the whole file. Cyclic GC is
+    paused during the parse since it only allocates short-lived, acyclic objects.
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pd.read_csv(source, usecols=INSTRUMENT_COLUMNS, dtype=INSTRUMENT_DTYPES,
+                           parse_dates=['SEM_EXPIRY_DATE'])
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+def write_instrument_cache(instrument_df, parquet_file):
+    """
+    Writes the columns we use from the instrument master to a Parquet file.
+    A failure here is not fatal; the next run simply falls back to the CSV.
+    """
+    temp_file = parquet_file + '.tmp'
+    try:
+        # Write beside the target and swap it in, so an interrupted write never leaves a truncated cache.
+        instrument_df[INSTRUMENT_COLUMNS].to_parquet(temp_file, engine='pyarrow', compression='zstd')
+        os.replace(temp_file, parquet_file)
+    except Exception as e:
+        print(f"Warning: Could not write instrument cache {parquet_file}: {e}")
+
+def build_security_id_index(instrument_df):
+    """
+    Builds the (exchange, trading symbol) -> security ID lookup for index options.
+    Done once per run so each leg lookup is a dict hit instead of a DataFrame scan.
+    """
+    options_df = instrument_df[instrument_df['SEM_EXCH_INSTRUMENT_TYPE'] == 'OPTIDX']
+    SYMBOL_TO_SECID.clear()
+    SYMBOL_TO_SECID.update(zip(
+        zip(options_df['SEM_EXM_EXCH_ID'].astype(str).values, options_df['SEM_TRADING_SYMBOL'].values),
+        options_df['SEM_SMST_SECURITY_ID'].astype(str).values
+    ))
+
+def get_security_id_from_symbol(trading_symbol, exchange='NSE'):
+    """
+    Finds the security ID for a given trading symbol from the prebuilt index.
+    """
+    security_id = SYMBOL_TO_SECID.get((exchange, trading_symbol))
+    if security_id is None:
+        print(f"Warning: Could not find security ID for symbol: {trading_symbol}")
+    return security_id
@@ -1,8 +1,10 @@
 import config
 import pandas as pd
 from datetime import datetime, date
+from functools import lru_cache
 import os
 import time
+from instruments import get_instrument_df, get_security_id_from_symbol
 
 try:
     from dhanhq import dhanhq
@@ -12,79 +14,47 @@ except ImportError:
 
 # --- Main Functions ---
 
-def get_instrument_file():
+def get_live_prices_batch(dhan, security_ids):
     """
-    Downloads or reads the master list of all tradable instruments from Dhan.
-    Saves it locally for the day to avoid re-downloading.
+    Fetches the live Last Traded Price (LTP) for several security IDs in one quote request.
+    Returns a dict of security ID -> LTP, with 0.0 for any ID that could not be priced.
     """
-    current_date_str = date.today().strftime("%Y-%m-%d")
-    dir_name = "Dependencies"
-    expected_file = os.path.join(dir_name, f"all_instrument {current_date_str}.csv")
-
-    if not os.path.exists(dir_name):
-        os.makedirs(dir_name)
-
-    if os.path.exists(expected_file):
-        print(f"Reading existing instrument file for today.")
-        return pd.read_csv(expected_file, low_memory=False)
-    else:
-        for item in os.listdir(dir_name):
-            if item.startswith('all_instrument'):
-                os.remove(os.path.join(dir_name, item))
-        
-        print("Downloading new instrument file from Dhan...")
-        try:
-            instrument_df = pd.read_csv("https://images.dhan.co/api-data/api-scrip-master.csv", low_memory=False)
-            instrument_df.to_csv(expected_file, index=False)
-            print("New instrument file downloaded successfully.")
-            return instrument_df
-        except Exception as e:
-            print(f"FATAL: Error downloading instrument file: {e}")
-            return None
-
-def get_security_id_from_symbol(instrument_df, trading_symbol, exchange='NSE'):
-    """
-    Finds the security ID for a given trading symbol from the master instrument DataFrame.
-    """
-    try:
-        filtered_df = instrument_df[
-            (instrument_df['SEM_TRADING_SYMBOL'] == trading_symbol) &
-            (instrument_df['SEM_EXM_EXCH_ID'] == exchange)
-        ]
-        if not filtered_df.empty:
-            return str(filtered_df.iloc[0]['SEM_SMST_SECURITY_ID'])
-    except Exception as e:
-        print(f"Error finding security ID for {trading_symbol}: {e}")
-    
-    print(f"Warning: Could not find security ID for symbol: {trading_symbol}")
-    return None
-
-def get_live_price(dhan, security_id):
-    """
-    Fetches the live Last Traded Price (LTP) for a given security ID.
-    """
-    if not security_id:
-        return 0.0
+    prices = {security_id: 0.0 for security_id in security_ids}
+    if not prices:
+        return prices
     try:
-        # The function expects the keyword 'securities' and a dictionary payload.
-        securities_payload = {'NSE_FNO': [security_id]}
+        securities_payload = {'NSE_FNO': list(prices)}
         response = dhan.quote_data(securities=securities_payload)
-        
-        if response.get('status') == 'success':
-            # The response nests the data under the security ID
-            return response['data'][security_id]['ltp']
     except Exception as e:
-        print(f"Error fetching live price for security ID {security_id}: {e}")
-    return 0.0
+        print(f"Error fetching live prices for security IDs {list(prices)}: {e}")
+        return prices
+
+    response = response or {}
+    if response.get('status') != 'success':
+        print(f"Warning: Quote request failed with status {response.get('status')}: {response.get('remarks')}")
+        return prices
+
+    data = response.get('data') or {}
+    for security_id in prices:
+        prices[security_id] = data.get(security_id, {}).get('ltp', 0.0) or 0.0
+
+    missing_ids = [security_id for security_id, ltp in prices.items() if not ltp]
+    if missing_ids:
+        print(f"Warning: No LTP in quote response for security IDs {missing_ids}: {response.get('remarks')}")
+    return prices
 
+@lru_cache(maxsize=None)
+def _expiry_tag(expiry_date):
+    """Formats a 'YYYY-MM-DD' expiry as the symbol's month tag, e.g. 'Sep2025'."""
+    return datetime.strptime(expiry_date, '%Y-%m-%d').strftime('%b%Y').capitalize()
+
+@lru_cache(maxsize=4096)
 def construct_trading_symbol(underlying, expiry_date, strike, option_type):
     """
     Constructs the trading symbol string in the correct format.
     Example: 'BANKNIFTY-Sep2025-48300-CE'
     """
-    dt_expiry = datetime.strptime(expiry_date, '%Y-%m-%d')
-    month_year_str = dt_expiry.strftime('%b%Y').capitalize()
-    return f"{underlying}-{month_year_str}-{strike}-{option_type}"
+    return f"{underlying}-{_expiry_tag(expiry_date)}-{strike}-{option_type}"
 
 def run_live_paper_trade(dhan):
     """
@@ -93,7 +63,7 @@ def run_live_paper_trade(dhan):
     """
     print(f"\n--- Running Live Paper Trade for {date.today().strftime('%Y-%m-%d')} ---")
     
-    instrument_df = get_instrument_file()
+    instrument_df = get_instrument_df()
     if instrument_df is None:
         return
 
@@ -116,19 +86,21 @@ def run_live_paper_trade(dhan):
     print(f"Strikes -> Short PE: {short_pe_strike}, Hedge PE: {hedge_pe_strike}")
 
     # --- Construct Trading Symbols ---
-    symbols = {
-        "Short CE": construct_trading_symbol(config.TRADING_SYMBOL, expiry_str, short_ce_strike, 'CE'),
-        "Hedge CE": construct_trading_symbol(config.TRADING_SYMBOL, expiry_str, hedge_ce_strike, 'CE'),
-        "Short PE": construct_trading_symbol(config.TRADING_SYMBOL, expiry_str, short_pe_strike, 'PE'),
-        "Hedge PE": construct_trading_symbol(config.TRADING_SYMBOL, expiry_str, hedge_pe_strike, 'PE')
+    legs = {
+        "Short CE": (short_ce_strike, 'CE'),
+        "Hedge CE": (hedge_ce_strike, 'CE'),
+        "Short PE": (short_pe_strike, 'PE'),
+        "Hedge PE": (hedge_pe_strike, 'PE')
     }
+    symbols = {name: construct_trading_symbol(config.TRADING_SYMBOL, expiry_str, strike, option_type)
+               for name, (strike, option_type) in legs.items()}
     
     print("\nConstructed Trading Symbols:")
     for name, symbol in symbols.items():
         print(f"- {name}: {symbol}")
 
     # --- Find Security IDs ---
-    ids = {name: get_security_id_from_symbol(instrument_df, symbol) for name, symbol in symbols.items()}
+    ids = {name: get_security_id_from_symbol(symbol) for name, symbol in symbols.items()}
 
     if not all(ids.values()):
         print("\nCould not find all security IDs. Please check symbols and master file.")
@@ -136,7 +108,8 @@ def run_live_paper_trade(dhan):
 
     # --- Fetch Live Prices ---
     print("\nFetching live prices...")
-    prices = {name: get_live_price(dhan, security_id) for name, security_id in ids.items()}
+    ltps = get_live_prices_batch(dhan, list(ids.values()))
+    prices = {name: ltps[security_id] for name, security_id in ids.items()}
 
     # --- Log the Data ---
     trade_log = {
@@ -152,26 +125,26 @@ def run_live_paper_trade(dhan):
     
     print("\n--- Live Trade Data Captured ---")
     print(pd.Series(trade_log))
-    export_to_excel(trade_log)
+    export_trade_log(trade_log)
 
-def export_to_excel(trade_log):
-    """Exports the trade log dictionary to an Excel file."""
+def export_trade_log(trade_log):
+    """
+    Appends the trade log dictionary as a new row of the CSV log file.
+    On the first write, rows from the old Excel log are copied in so no history is lost.
+    """
     if not trade_log: return
     new_df = pd.DataFrame([trade_log])
-    filename = config.EXCEL_FILE_NAME
-    columns = list(trade_log.keys())
-    new_df = new_df[columns]
+    filename = config.TRADE_LOG_FILE
 
     try:
-        if os.path.isfile(filename):
-            existing_df = pd.read_excel(filename)
-            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        else:
-            combined_df = new_df
-        combined_df.to_excel(filename, index=False, sheet_name='LiveTrades')
+        if not os.path.isfile(filename) and os.path.isfile(config.EXCEL_FILE_NAME):
+            old_df = pd.read_excel(config.EXCEL_FILE_NAME)
+            old_df.to_csv(filename, index=False)
+            print(f"Copied {len(old_df)} rows from {config.EXCEL_FILE_NAME} into {filename}")
+        new_df.to_csv(filename, mode='a', header=not os.path.isfile(filename), index=False)
         print(f"\nSuccessfully exported trade data to {filename}")
     except Exception as e:
-        print(f"Error exporting to Excel: {e}")
+        print(f"Error exporting trade log: {e}")
 
 if __name__ == "__main__":
     try:
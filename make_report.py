@@ -0,0 +1,18 @@
+import config
+import pandas as pd
+import os
+
+def make_report():
+    """Converts the CSV trade log into an Excel workbook for review."""
+    if not os.path.isfile(config.TRADE_LOG_FILE):
+        print(f"No trade log found at {config.TRADE_LOG_FILE}")
+        return
+    try:
+        trade_df = pd.read_csv(config.TRADE_LOG_FILE)
+        trade_df.to_excel(config.REPORT_FILE_NAME, index=False, sheet_name='LiveTrades')
+        print(f"Successfully wrote {len(trade_df)} trades to {config.REPORT_FILE_NAME}")
+    except Exception as e:
+        print(f"Error writing Excel report: {e}")
+
+if __name__ == "__main__":
+    make_report()